@@ -1,100 +1,207 @@
 """
 LangChain Agent for E-commerce Customer Service (using Groq API)
 """
-from mock_databases import MockOrderDatabase, MockProductDatabase, MockCustomerDatabase
+import asyncio
+import hashlib
 import os
+import re
+import threading
 import traceback
-from typing import Dict, List, Any
+from collections import OrderedDict, defaultdict
+from types import MappingProxyType
+from typing import Dict, List, Any, AsyncIterator, Iterator, Mapping
+import httpx
 from dotenv import load_dotenv
 
-from langchain.agents import AgentExecutor, create_react_agent
+from langchain.agents import AgentExecutor, create_tool_calling_agent
 from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain.memory import ConversationBufferWindowMemory
-from langchain_core.messages import HumanMessage, AIMessage
-from tools import get_tools  # Assumes you have a tools.py file with custom tool definitions
-from langchain_core.output_parsers import BaseOutputParser
-from langchain_core.agents import AgentAction, AgentFinish
-import re
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import RunnableSequence
+from langchain.memory import ConversationSummaryBufferMemory
+from langchain_core.messages import SystemMessage
+from tools import get_tools, with_turn_cache  # Assumes you have a tools.py file with custom tool definitions
 
-class SafeOutputParser(BaseOutputParser):
-    """A patched parser that avoids ReAct parser crash on malformed output"""
+load_dotenv()  # Load .env file if available
 
-    def parse(self, text: str):
-        try:
-            if "Final Answer:" in text:
-                # Return final answer
-                final_answer = text.split("Final Answer:")[-1].strip()
-                return AgentFinish(return_values={"output": final_answer}, log=text)
-            
-            # Match typical ReAct format
-            action_match = re.search(r"Action: (.*)\nAction Input: (.*)", text)
-            if action_match:
-                return AgentAction(
-                    tool=action_match.group(1).strip(),
-                    tool_input=action_match.group(2).strip(),
-                    log=text
-                )
-            
-            # Default fallback
-            return AgentFinish(return_values={"output": text.strip()}, log=text)
-        
-        except Exception as e:
-            # Fallback to safe finish with raw output
-            return AgentFinish(return_values={"output": f"[Unparsed Output] {text.strip()}"}, log=text)
+# Static system prompt. Everything dynamic (history, customer context, the
+# question) comes after it so the prefix stays cache-eligible.
+SYSTEM_PROMPT = """You are a friendly, professional customer service agent for an e-commerce store.
+You handle: greetings, orders (status, tracking, cancellation, returns), product search, details and recommendations, customer accounts and preferences, and weather for shipping estimates.
+- Choose and chain tools yourself; answer from tool results and give your best estimate when data is incomplete.
+- Use the conversation context; ask for clarification when a request is ambiguous.
+- Explain cancellation and return steps clearly and include order, product and reference IDs.
+- Be concise and empathetic, and always reply to the customer.
+"""
 
-load_dotenv()  # Load .env file if available
+def _approx_token_count(text: str) -> int:
+    """Rough token estimate (~4 characters per token for English text)"""
+    return len(text) // 4
+
+def _approx_token_ids(text: str) -> List[int]:
+    """Placeholder token ids for memory pruning (avoids a tokenizer dependency)"""
+    return [0] * _approx_token_count(text)
+
+# The system prompt is re-sent on every model call of every turn; keep it small.
+assert _approx_token_count(SYSTEM_PROMPT) < 450, "SYSTEM_PROMPT exceeds its token budget"
+
+# Small, fast model used only to summarize older conversation turns
+SUMMARY_MODEL = "llama3-8b-8192"
+
+# Models tried in order when the primary model cannot be used
+FALLBACK_MODELS = [
+    "llama3-8b-8192",    # Smaller LLaMA 3 model
+    "mixtral-8x7b-32768", # Mixtral model
+    "gemma2-9b-it"        # Gemma model
+]
+
+# Iteration budgets; multi-part questions get a little more room
+_DEFAULT_MAX_ITERATIONS = 3
+_COMPLEX_MAX_ITERATIONS = 5
+_COMPLEX_QUERY_MARKERS = (" and ", " then ", " also ", " as well")
+
+# Chat roles for stored message types (human/ai); other types are skipped
+_ROLE_BY_MESSAGE_TYPE = {"human": "user", "ai": "assistant"}
+
+# Tools with side effects; turns that call them are never served from cache
+_WRITE_TOOLS = frozenset({"cancel_order", "process_return", "update_preferences"})
+_RESPONSE_CACHE_SIZE = 256
+
+# Prefix of the executor's own output when it gives up before answering
+_EARLY_STOP_PREFIX = "Agent stopped due to"
+
+# Connection pools shared by every ChatGroq instance (primary, fallback,
+# summarizer, switched models) so warm keep-alive connections are reused
+# instead of each client opening its own sockets and TLS sessions. The async
+# client is only ever used from the agent loop below.
+_HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+_SHARED_HTTP_CLIENT = httpx.Client(limits=_HTTP_LIMITS, timeout=httpx.Timeout(120.0))
+_SHARED_ASYNC_HTTP_CLIENT = httpx.AsyncClient(limits=_HTTP_LIMITS, timeout=httpx.Timeout(120.0))
+
+# A single long-lived event loop runs every async agent call. Reusing one loop
+# (instead of asyncio.run per message) keeps the async Groq HTTP client's
+# pooled connections valid between turns.
+_agent_loop = None
+_agent_loop_lock = threading.Lock()
+
+def _get_agent_loop() -> asyncio.AbstractEventLoop:
+    """Return the background event loop, starting it on first use"""
+    global _agent_loop
+    with _agent_loop_lock:
+        if _agent_loop is None:
+            _agent_loop = asyncio.new_event_loop()
+            threading.Thread(target=_agent_loop.run_forever, name="agent-loop", daemon=True).start()
+    return _agent_loop
+
+def _run_sync(coro):
+    """Run a coroutine on the background loop and block for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_agent_loop()).result()
+
+def _normalize_text(text: str) -> str:
+    """Lowercase, trim and collapse whitespace for cache keys"""
+    return re.sub(r"\s+", " ", text.strip().lower())
+
+def _handle_parsing_error(error: Exception) -> str:
+    """Terse correction sent back to the model when its output can't be parsed"""
+    return "Invalid tool call. Reply with one valid tool call or a plain-text answer."
+
+_STREAM_END = object()
+
+async def _next_or_end(stream: AsyncIterator[str]):
+    """Await the next chunk of an async stream, or _STREAM_END when exhausted"""
+    try:
+        return await stream.__anext__()
+    except StopAsyncIteration:
+        return _STREAM_END
+
+async def _pump_events(events: AsyncIterator[dict], queue: asyncio.Queue):
+    """Feed agent events into queue under one turn cache, ending with _STREAM_END
+
+    Runs as its own task so the turn cache is set and reset in a single
+    context, however many tasks the consumer reads the queue from.
+    """
+    try:
+        with with_turn_cache():
+            async for event in events:
+                queue.put_nowait(event)
+    finally:
+        queue.put_nowait(_STREAM_END)
+
+def _unstreamed_tail(streamed: str, final: str) -> str:
+    """Part of the executor's final answer the UI has not been sent yet
+
+    The final answer is not always streamed model text (e.g. "Agent stopped
+    due to max iterations."), so whatever differs is sent after the stream.
+    """
+    if final.startswith(streamed):
+        return final[len(streamed):]
+    return f"\n\n{final}"
+
+async def _close_stream(stream):
+    """Close an async stream early (e.g. when the UI stops reading)"""
+    await stream.aclose()
+
+def _is_model_unavailable(error: Exception) -> bool:
+    """True for Groq API errors caused by the model rather than the request
+
+    Transient 5xx responses are left to the client's own retries; switching
+    models on them would move the agent off a healthy model for good.
+    """
+    status = getattr(error, "status_code", None)
+    return status == 404 or (status == 400 and "model" in str(error).lower())
 
 class EcommerceAgent:
     """E-commerce customer service agent using Groq API"""
 
-    def __init__(self, groq_api_key: str = None):
+    # Compiled prompts keyed by the sorted tool names they were built for
+    _PROMPT_CACHE: Dict[tuple, ChatPromptTemplate] = {}
+
+    def __init__(self, groq_api_key: str = None, lazy_fallback: bool = True):
         """Initialize the agent with tools and memory
 
         Args:
             groq_api_key: API key for Groq (if not in environment)
+            lazy_fallback: Move to the next fallback model if the model proves
+                unavailable on first use; agents shared under a fixed model
+                name pass False so they never change model behind their callers
         """
 
         # Set Groq API key
         if groq_api_key:
             os.environ["GROQ_API_KEY"] = groq_api_key
 
+        # Fallbacks still available if the current model fails on first use
+        self._untried_fallbacks = list(FALLBACK_MODELS)
+
         # Initialize Groq LLM
         self.llm = self._initialize_llm()
+        if not lazy_fallback:
+            self._untried_fallbacks.clear()
 
         # Load tools
         self.tools = get_tools()
 
-        # Memory for conversation
-        self.memory = ConversationBufferWindowMemory(
-            memory_key="chat_history",
-            return_messages=True,
-            output_key="output",
-            k=10
-        )
+        # Summarizer for turns that fall out of the memory's token budget
+        self.summarizer_llm = self._initialize_summarizer_llm()
+
+        # Default conversation memory for single-conversation callers; shared
+        # deployments pass a per-session memory from create_memory() instead.
+        self.memory = self.create_memory()
+
+        # LRU cache of final answers for repeated questions (FAQs, quick actions)
+        self._response_cache: "OrderedDict[bytes, str]" = OrderedDict()
 
         # Prompt setup
         self.prompt = self._create_prompt()
 
         # Agent creation
-        self.agent = create_react_agent(
+        self.agent = create_tool_calling_agent(
             llm=self.llm,
             tools=self.tools,
             prompt=self.prompt
         )
 
-        # Agent executor
-        self.agent_executor = AgentExecutor(
-            agent=self.agent,
-            tools=self.tools,
-            memory=self.memory,
-            verbose=True,
-            handle_parsing_errors=True,
-            max_iterations=5,
-            return_intermediate_steps=True,
-           
-            output_parser=SafeOutputParser()
-        )
+        # Agent executors
+        self._create_executors()
 
     def _initialize_llm(self):
         """Initialize Groq LLM"""
@@ -110,11 +217,13 @@ class EcommerceAgent:
             # Initialize ChatGroq with optimized settings for customer service
             llm = ChatGroq(
                 groq_api_key=groq_api_key,
+                http_client=_SHARED_HTTP_CLIENT,
+                http_async_client=_SHARED_ASYNC_HTTP_CLIENT,
                 model_name="llama3-70b-8192",  # Fast and capable model
                 temperature=0,  # Low temperature for consistent responses
                 max_tokens=1024,
                 top_p=0.9,
-                streaming=False,
+                streaming=True,
                 # Additional parameters for better performance
                 request_timeout=120,
                 max_retries=10
@@ -129,34 +238,32 @@ class EcommerceAgent:
             return self._initialize_fallback_llm()
 
     def _initialize_fallback_llm(self):
-        """Fallback to a different Groq model if the primary fails"""
-        
-        fallback_models = [
-            "llama3-8b-8192",    # Smaller LLaMA 3 model
-            "mixtral-8x7b-32768", # Mixtral model
-            "gemma2-9b-it"        # Gemma model
-        ]
+        """Fallback to a different Groq model if the primary fails
+
+        Models are not probed with a test query here; a model that turns out
+        to be unavailable is replaced on the first real request instead.
+        """
         
         groq_api_key = os.getenv("GROQ_API_KEY")
         
-        for model_name in fallback_models:
+        while self._untried_fallbacks:
+            model_name = self._untried_fallbacks.pop(0)
             try:
                 print(f"Trying fallback model: {model_name}")
                 
                 llm = ChatGroq(
                     groq_api_key=groq_api_key,
+                    http_client=_SHARED_HTTP_CLIENT,
+                    http_async_client=_SHARED_ASYNC_HTTP_CLIENT,
                     model_name=model_name,
                     temperature=0.2,
                     max_tokens=1024,
                     top_p=0.9,
-                    streaming=False,
+                    streaming=True,
                     request_timeout=60,
                     max_retries=5
                 )
                 
-                # Test the model with a simple query
-                test_response = llm.invoke("Hello")
-                
                 print(f"✅ Fallback model {model_name} loaded successfully!")
                 return llm
                 
@@ -166,129 +273,318 @@ class EcommerceAgent:
         
         raise ValueError("Failed to load both primary and all fallback models")
 
-    def _create_prompt(self):
-        """Create the system prompt for the agent"""
-
-        template ="""
-You are an AI customer service representative for an e-commerce platform. Your role is to help customers with their inquiries in a friendly, professional, and efficient manner.
-
-Your Capabilities:
-- If the user greets with "Hello" or "Hi", respond with a friendly greeting.
-- Handle customer inquiries about orders, products, and account information.
-- Check order status, cancel orders, and process returns.
-- Search for products and provide detailed product information.
-- Access customer information and update preferences.
-- Get weather information for shipping estimates.
-- Provide product recommendations based on weather or preferences.
-- Make autonomous decisions about which tools to use.
-- Chain multiple tools together when needed.
-
-Guidelines:
-1. Be Proactive: Anticipate customer needs and offer relevant information.
-2. Be Contextual: Remember previous conversation context and use it appropriately.
-3. Be Autonomous: Decide which tools to use based on customer queries without asking for permission.
-4. Be Helpful: If you can't solve a problem directly, offer alternatives or escalation paths.
-5. Be Professional: Maintain a friendly, helpful tone while being efficient.
-6. Chain Tools: Use multiple tools in sequence when it provides better customer service.
-
-Important Notes:
-- Always prioritize customer satisfaction.
-- If unsure, ask for clarification rather than guessing.
-- When handling cancellations or returns, explain the process clearly.
-- Provide order IDs, product IDs, and reference numbers when relevant.
-- Be empathetic with complaints or issues.
-- Always include "Final Answer:" even if tools fail.
-- Never leave the customer hanging without a response.
-Always use the data from the database to answer the questions
-if you cannot parse data from database alone give your best guess based on the data you have
-Tools Available:
-{tools}
-
-Conversation history:
-{chat_history}
-
-Question: {input}
-Thought: I should consider the user's request and decide the best tool to use.
-Action: [Choose one from {tool_names}]
-Action Input: [Input for the selected tool]
-Observation: [Result from the tool]
-
-[Repeat Thought/Action/Action Input/Observation steps if necessary, but limit repetitions.]
-
-Thought: I now have the information I need to respond {agent_scratchpad}
-Final Answer: [Your complete, helpful response to the user.]
+    def _create_executors(self):
+        """Create executors for normal and multi-part queries
 
+        Most customer-service turns need a single tool call, so the default
+        executor gets a tight iteration budget; each iteration saved is one
+        full model call.
+        """
+        self.agent_executor = self._build_executor(_DEFAULT_MAX_ITERATIONS)
+        self.complex_agent_executor = self._build_executor(_COMPLEX_MAX_ITERATIONS)
 
-"""
+    def _build_executor(self, max_iterations: int) -> AgentExecutor:
+        """Create a memory-less executor with the given iteration budget"""
+        return AgentExecutor(
+            agent=self.agent,
+            tools=self.tools,
+            verbose=True,
+            handle_parsing_errors=_handle_parsing_error,
+            max_iterations=max_iterations,
+            return_intermediate_steps=True
+        )
+
+    def _executor_for(self, message: str) -> AgentExecutor:
+        """Pick the executor whose iteration budget fits the message"""
+        lowered = message.lower()
+        if any(marker in lowered for marker in _COMPLEX_QUERY_MARKERS):
+            return self.complex_agent_executor
+        return self.agent_executor
+
+    def create_memory(self) -> ConversationSummaryBufferMemory:
+        """Create conversation memory for one session
+
+        Recent turns are kept verbatim and older turns as a rolling summary,
+        so the main model's input stays bounded.
+        """
+        return ConversationSummaryBufferMemory(
+            llm=self.summarizer_llm,
+            memory_key="chat_history",
+            return_messages=True,
+            output_key="output",
+            max_token_limit=800
+        )
 
-        return PromptTemplate(
-            template=template,
-            input_variables=["input", "chat_history", "agent_scratchpad"],
-            partial_variables={
-                "tools": "\n".join([f"{tool.name}: {tool.description}" for tool in self.tools]),
-                "tool_names": ", ".join([tool.name for tool in self.tools])
-            }
+    def _initialize_summarizer_llm(self):
+        """Initialize the small Groq model that summarizes older turns"""
+        return ChatGroq(
+            groq_api_key=os.getenv("GROQ_API_KEY"),
+            http_client=_SHARED_HTTP_CLIENT,
+            http_async_client=_SHARED_ASYNC_HTTP_CLIENT,
+            model_name=SUMMARY_MODEL,
+            temperature=0,
+            max_tokens=256,
+            request_timeout=60,
+            max_retries=3,
+            custom_get_token_ids=_approx_token_ids
         )
 
-    def process_message(self, message: str, customer_context: Dict[str, Any] = None) -> str:
-        """Process a customer message and return response"""
+    def _create_prompt(self):
+        """Create the chat prompt for the tool-calling agent
+
+        The prompt is built once per tool set and shared by every agent
+        instance (e.g. one per Streamlit session), leaving only input,
+        chat_history and agent_scratchpad to fill in per call.
+        """
+
+        cache_key = tuple(sorted(tool.name for tool in self.tools))
+        prompt = EcommerceAgent._PROMPT_CACHE.get(cache_key)
+        if prompt is None:
+            # The system block is a literal message rather than a template so the
+            # serialized request prefix is byte-identical on every call and can be
+            # reused by prompt caching. Tools are bound to the model as JSON-schema
+            # functions, so the prompt needs no tool catalog or ReAct scaffolding.
+            prompt = ChatPromptTemplate.from_messages([
+                SystemMessage(content=SYSTEM_PROMPT),
+                MessagesPlaceholder(variable_name="chat_history"),
+                ("human", "{input}"),
+                MessagesPlaceholder(variable_name="agent_scratchpad")
+            ])
+            EcommerceAgent._PROMPT_CACHE[cache_key] = prompt
+        return prompt
+
+    def _history_fingerprint(self, messages) -> str:
+        """Hash the last two turns, normalized, so cosmetic differences still hit"""
+        text = " ".join(_normalize_text(msg.content) for msg in messages[-4:])
+        return hashlib.blake2b(text.encode(), digest_size=8).hexdigest()
+
+    def _response_cache_key(self, message: str, customer_context: Dict[str, Any],
+                            memory: ConversationSummaryBufferMemory) -> bytes:
+        """Key a response by model, normalized prompt, customer and recent history"""
+        raw = "\x00".join((
+            self.llm.model_name,
+            _normalize_text(message),
+            str(customer_context),
+            self._history_fingerprint(memory.chat_memory.messages)
+        ))
+        return hashlib.blake2b(raw.encode(), digest_size=16).digest()
+
+    def _cache_response(self, key: bytes, output: str):
+        """Store a response, evicting the least recently used entry when full"""
+        self._response_cache[key] = output
+        self._response_cache.move_to_end(key)
+        if len(self._response_cache) > _RESPONSE_CACHE_SIZE:
+            self._response_cache.popitem(last=False)
+
+    def _update_response_cache(self, key: bytes, output: str, used_write_tool: bool):
+        """Cache a finished answer, or drop every cached answer after a write
+
+        A write in any session can make cached read answers stale, and early
+        stops or empty outputs are failures rather than answers worth reusing.
+        """
+        if used_write_tool:
+            self._response_cache.clear()
+        elif key is not None and output.strip() and not output.startswith(_EARLY_STOP_PREFIX):
+            self._cache_response(key, output)
+
+    def _add_context(self, message: str, customer_context: Dict[str, Any] = None) -> str:
+        """Append the customer context to the message sent to the agent"""
+        if customer_context:
+            return message + f"\nCustomer Context: {customer_context}"
+        return message
+
+    async def _cached_response(self, cache_key: bytes, message: str,
+                               memory: ConversationSummaryBufferMemory):
+        """Return a cached answer (recording the turn in memory), or None"""
+        if cache_key is None or cache_key not in self._response_cache:
+            return None
+        self._response_cache.move_to_end(cache_key)
+        output = self._response_cache[cache_key]
+        await memory.asave_context({"input": message}, {"output": output})
+        return output
+
+    def _try_next_fallback(self, error: Exception) -> bool:
+        """Switch to the next fallback model if the error is the model's fault
+
+        A model that was never verified may be unknown or decommissioned;
+        moving on lets the caller retry the same request.
+        """
+        if not (self._untried_fallbacks and _is_model_unavailable(error)):
+            return False
+        next_model = self._untried_fallbacks.pop(0)
+        print(f"❌ Model {self.llm.model_name} unavailable ({error}); trying {next_model}")
+        return self.switch_model(next_model)
+
+    async def _handle_error(self, message: str, e: Exception,
+                            memory: ConversationSummaryBufferMemory) -> str:
+        """Map an agent failure to a customer-facing message and record it"""
+        error_msg = f"I apologize, but I encountered an error while processing your request: {str(e)}"
+        print(f"Error details: {traceback.format_exc()}")
+        
+        # Handle specific Groq API errors
+        if "rate limit" in str(e).lower():
+            error_msg = "I'm currently experiencing high demand. Please wait a moment and try again."
+        elif "authentication" in str(e).lower() or "api key" in str(e).lower():
+            error_msg = "There seems to be an issue with the API authentication. Please contact support."
+        elif "timeout" in str(e).lower():
+            error_msg = "The request timed out. Please try again with a shorter message."
+        
+        await memory.asave_context(
+            {"input": message},
+            {"output": error_msg}
+        )
+        return error_msg
+
+    def process_message(self, message: str, customer_context: Dict[str, Any] = None,
+                        use_cache: bool = True,
+                        memory: ConversationSummaryBufferMemory = None) -> str:
+        """Process a customer message and return response (sync wrapper)"""
+        return _run_sync(self.aprocess_message(message, customer_context, use_cache, memory))
+
+    async def aprocess_message(self, message: str, customer_context: Dict[str, Any] = None,
+                               use_cache: bool = True,
+                               memory: ConversationSummaryBufferMemory = None) -> str:
+        """Process a customer message asynchronously and return response
+
+        The async executor dispatches all tool calls from one model step
+        concurrently, so independent lookups cost max(tool) instead of sum(tool).
+        Repeated questions are answered from the response cache unless
+        use_cache is False. memory is the caller's session memory (defaults
+        to self.memory).
+        """
+        if memory is None:
+            memory = self.memory
 
         try:
-            enhanced_message = message
-            if customer_context:
-                context_info = f"\nCustomer Context: {customer_context}"
-                enhanced_message = message + context_info
-
-            chat_history = ""
-            for msg in self.memory.chat_memory.messages:
-                if isinstance(msg, HumanMessage):
-                    chat_history += f"Human: {msg.content}\n"
-                elif isinstance(msg, AIMessage):
-                    chat_history += f"AI: {msg.content}\n"
-
-            response = self.agent_executor.invoke({
-                "input": enhanced_message,
-                "chat_history": chat_history
-            })
-
-            self.memory.save_context(
-                {"input": message},
-                {"output": response["output"]}
-            )
+            enhanced_message = self._add_context(message, customer_context)
+
+            cache_key = self._response_cache_key(message, customer_context, memory) if use_cache else None
+            cached = await self._cached_response(cache_key, message, memory)
+            if cached is not None:
+                return cached
+
+            # History is passed in explicitly (the executor holds no memory) so
+            # one executor can serve many sessions.
+            chat_history = (await memory.aload_memory_variables({}))["chat_history"]
+            with with_turn_cache():
+                response = await self._executor_for(message).ainvoke({
+                    "input": enhanced_message,
+                    "chat_history": chat_history
+                })
+            await memory.asave_context({"input": message}, {"output": response["output"]})
+
+            # The model has answered, so startup fallbacks are no longer needed
+            self._untried_fallbacks.clear()
+
+            used_write_tool = any(action.tool in _WRITE_TOOLS for action, _ in response["intermediate_steps"])
+            self._update_response_cache(cache_key, response["output"], used_write_tool)
 
             return response["output"]
 
         except Exception as e:
-            error_msg = f"I apologize, but I encountered an error while processing your request: {str(e)}"
-            print(f"Error details: {traceback.format_exc()}")
-            
-            # Handle specific Groq API errors
-            if "rate limit" in str(e).lower():
-                error_msg = "I'm currently experiencing high demand. Please wait a moment and try again."
-            elif "authentication" in str(e).lower() or "api key" in str(e).lower():
-                error_msg = "There seems to be an issue with the API authentication. Please contact support."
-            elif "timeout" in str(e).lower():
-                error_msg = "The request timed out. Please try again with a shorter message."
-            
-            self.memory.save_context(
-                {"input": message},
-                {"output": error_msg}
+            if self._try_next_fallback(e):
+                return await self.aprocess_message(message, customer_context, use_cache, memory)
+            return await self._handle_error(message, e, memory)
+
+    def stream_message(self, message: str, customer_context: Dict[str, Any] = None,
+                       use_cache: bool = True,
+                       memory: ConversationSummaryBufferMemory = None) -> Iterator[str]:
+        """Stream the final answer as text chunks (sync wrapper for st.write_stream)"""
+        stream = self.astream_message(message, customer_context, use_cache, memory)
+        try:
+            while True:
+                chunk = _run_sync(_next_or_end(stream))
+                if chunk is _STREAM_END:
+                    return
+                yield chunk
+        finally:
+            _run_sync(_close_stream(stream))
+
+    async def astream_message(self, message: str, customer_context: Dict[str, Any] = None,
+                              use_cache: bool = True,
+                              memory: ConversationSummaryBufferMemory = None) -> AsyncIterator[str]:
+        """Stream the final answer for a customer message as it is generated
+
+        Tool-calling steps run silently; only text tokens from the model's
+        answering step are yielded, so the first words reach the UI at
+        time-to-first-token instead of after the whole completion.
+        """
+        if memory is None:
+            memory = self.memory
+
+        enhanced_message = self._add_context(message, customer_context)
+        cache_key = self._response_cache_key(message, customer_context, memory) if use_cache else None
+        cached = await self._cached_response(cache_key, message, memory)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        final_output = None
+        used_write_tool = False
+        try:
+            chat_history = (await memory.aload_memory_variables({}))["chat_history"]
+            events = self._executor_for(message).astream_events(
+                {"input": enhanced_message, "chat_history": chat_history},
+                version="v2"
             )
-            return error_msg
-
-    def reset_conversation(self):
+            queue: asyncio.Queue = asyncio.Queue()
+            producer = asyncio.ensure_future(_pump_events(events, queue))
+            try:
+                while True:
+                    event = await queue.get()
+                    if event is _STREAM_END:
+                        break
+                    kind = event["event"]
+                    if kind == "on_chat_model_stream":
+                        chunk = event["data"]["chunk"]
+                        if chunk.content and not chunk.tool_call_chunks:
+                            chunks.append(chunk.content)
+                            yield chunk.content
+                    elif kind == "on_tool_start" and event["name"] in _WRITE_TOOLS:
+                        used_write_tool = True
+                    elif kind == "on_chain_end" and not event.get("parent_ids"):
+                        # The top-level executor run ends with the answer it returns
+                        final_output = event["data"]["output"]["output"]
+                await producer
+            finally:
+                producer.cancel()
+        except Exception as e:
+            if not chunks and self._try_next_fallback(e):
+                async for chunk in self.astream_message(message, customer_context, use_cache, memory):
+                    yield chunk
+                return
+            yield await self._handle_error(message, e, memory)
+            return
+
+        output = "".join(chunks)
+        if final_output is not None:
+            tail = _unstreamed_tail(output, final_output)
+            if tail:
+                yield tail
+            output = final_output
+        await memory.asave_context({"input": message}, {"output": output})
+
+        # The model has answered, so startup fallbacks are no longer needed
+        self._untried_fallbacks.clear()
+
+        self._update_response_cache(cache_key, output, used_write_tool)
+
+    def reset_conversation(self, memory: ConversationSummaryBufferMemory = None):
         """Reset the conversation memory"""
-        self.memory.clear()
+        if memory is None:
+            memory = self.memory
+        memory.clear()
 
-    def get_conversation_history(self) -> List[Dict[str, str]]:
+    def get_conversation_history(self, memory: ConversationSummaryBufferMemory = None) -> List[Dict[str, str]]:
         """Get the conversation history"""
-        history = []
-        for message in self.memory.chat_memory.messages:
-            if isinstance(message, HumanMessage):
-                history.append({"role": "user", "content": message.content})
-            elif isinstance(message, AIMessage):
-                history.append({"role": "assistant", "content": message.content})
-        return history
+        if memory is None:
+            memory = self.memory
+        return [
+            {"role": _ROLE_BY_MESSAGE_TYPE[message.type], "content": message.content}
+            for message in memory.chat_memory.messages
+            if message.type in _ROLE_BY_MESSAGE_TYPE
+        ]
 
     def get_available_models(self) -> List[str]:
         """Get list of available Groq models"""
@@ -298,6 +594,23 @@ Final Answer: [Your complete, helpful response to the user.]
            "gemma2-9b-it"
         ]
 
+    def _rebind_llm(self, llm: ChatGroq):
+        """Swap the chat model inside the existing agent runnable
+
+        The tool-calling agent is a RunnableSequence whose only model-specific
+        step is the tool-bound LLM, so the prompt, output parser and executors
+        are reused as they are.
+        """
+        bound_llm = llm.bind_tools(self.tools)
+        steps = [
+            bound_llm if getattr(step, "bound", None) is self.llm else step
+            for step in self.agent.steps
+        ]
+        self.agent = RunnableSequence(*steps)
+        for executor in (self.agent_executor, self.complex_agent_executor):
+            executor.agent.runnable = self.agent
+        self.llm = llm
+
     def switch_model(self, model_name: str):
         """Switch to a different Groq model"""
         try:
@@ -305,34 +618,21 @@ Final Answer: [Your complete, helpful response to the user.]
             
             new_llm = ChatGroq(
                 groq_api_key=groq_api_key,
+                http_client=_SHARED_HTTP_CLIENT,
+                http_async_client=_SHARED_ASYNC_HTTP_CLIENT,
                 model_name=model_name,
                 temperature=0.2,
                 max_tokens=1024,
                 top_p=0.9,
-                streaming=False,
+                streaming=True,
                 request_timeout=60,
                 max_retries=3
             )
             
-            # Test the new model
-            test_response = new_llm.invoke("Hello")
-            
-            # If successful, update the agent
-            self.llm = new_llm
-            self.agent = create_react_agent(
-                llm=self.llm,
-                tools=self.tools,
-                prompt=self.prompt
-            )
-            self.agent_executor = AgentExecutor(
-                agent=self.agent,
-                tools=self.tools,
-                memory=self.memory,
-                verbose=True,
-                handle_parsing_errors=True,
-                max_iterations=10,
-                return_intermediate_steps=True
-            )
+            # No test query: an unusable model fails fast on the first request
+            self._rebind_llm(new_llm)
+            if model_name in self._untried_fallbacks:
+                self._untried_fallbacks.remove(model_name)
             
             print(f"✅ Successfully switched to model: {model_name}")
             return True
@@ -346,25 +646,27 @@ Final Answer: [Your complete, helpful response to the user.]
         print("🧹 Session cleaned up")
 
 
+# Shared read-only context returned for sessions with no data yet
+_EMPTY_CONTEXT = MappingProxyType({})
+
 class CustomerContext:
-    """Manage customer context and session information"""
+    """Manage customer context and session information (thread-safe)"""
 
     def __init__(self):
-        self.sessions = {}
+        self.sessions = defaultdict(dict)
+        self._lock = threading.RLock()
 
-    def get_context(self, session_id: str) -> Dict[str, Any]:
-        return self.sessions.get(session_id, {})
+    def get_context(self, session_id: str) -> Mapping[str, Any]:
+        # .get() so unknown sessions are not inserted into the defaultdict
+        return self.sessions.get(session_id, _EMPTY_CONTEXT)
 
     def update_context(self, session_id: str, context: Dict[str, Any]):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = {}
-        self.sessions[session_id].update(context)
-
-    def set_customer_id(self, session_id: str, customer_id: str):
-        self.update_context(session_id, {"customer_id": customer_id})
+        with self._lock:
+            self.sessions[session_id].update(context)
 
-    def set_customer_email(self, session_id: str, email: str):
-        self.update_context(session_id, {"customer_email": email})
+    def set_field(self, session_id: str, field: str, value: Any):
+        with self._lock:
+            self.sessions[session_id][field] = value
 
 
 # Global customer context manager
@@ -2,6 +2,7 @@ import streamlit as st
 import os
 from datetime import datetime
 import uuid
+from pathlib import Path
 from dotenv import load_dotenv
 import time
 from agent import EcommerceAgent, customer_context_manager
@@ -17,95 +18,29 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Custom CSS
-st.markdown("""
-<style>
-    .main { padding-top: 1rem; }
-    .chat-message {
-        padding: 1rem;
-        border-radius: 0.5rem;
-        margin-bottom: 1rem;
-        display: flex;
-        align-items: flex-start;
-    }
-    .chat-message.user {
-        background-color: #e3f2fd;
-        flex-direction: row-reverse;
-        color: black;
-    }
-    .chat-message.bot {
-        background-color: #f5f5f5;
-        color: black;
-    }
-    .chat-message .avatar {
-        width: 40px;
-        height: 40px;
-        border-radius: 50%;
-        margin: 0 10px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        font-weight: bold;
-        color: white;
-    }
-    .chat-message.user .avatar { background-color: #2196f3; }
-    .chat-message.bot .avatar { background-color: #4caf50; }
-    .chat-message .message { flex: 1; padding: 0 10px; }
-    .status-card {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin-bottom: 1rem;
-    }
-    .metric-card {
-        background: white;
-        padding: 1rem;
-        border-radius: 10px;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-        text-align: center;
-        color: black;
-    }
-    .metric-card h3 {
-        color: #4caf50;
-        margin: 0;
-    }
-    .metric-card p {
-        margin: 5px 0 0 0;
-        color: #666;
-    }
-    .groq-badge {
-        background: linear-gradient(135deg, #ff6b6b, #4ecdc4);
-        color: white;
-        padding: 0.5rem 1rem;
-        border-radius: 20px;
-        font-weight: bold;
-        text-align: center;
-        margin-bottom: 1rem;
-    }
-    .model-selector {
-        background: #f8f9fa;
-        padding: 1rem;
-        border-radius: 10px;
-        border: 1px solid #e9ecef;
-        margin-bottom: 1rem;
-    }
-    .loading-spinner {
-        border: 4px solid #f3f3f3;
-        border-top: 4px solid #3498db;
-        border-radius: 50%;
-        width: 20px;
-        height: 20px;
-        animation: spin 1s linear infinite;
-        display: inline-block;
-        margin-right: 10px;
-    }
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(360deg); }
-    }
-</style>
-""", unsafe_allow_html=True)
+# Model a new session starts on
+DEFAULT_MODEL = "llama3-70b-8192"
+
+# Number of most recent chat messages rendered without loading older history
+VISIBLE_MESSAGES = 30
+
+# Custom CSS, kept in a static file and read once per process
+CSS_PATH = Path(__file__).parent / "assets" / "chat.css"
+
+@st.cache_data
+def load_css():
+    """Read the app stylesheet (cached across reruns and sessions)"""
+    return CSS_PATH.read_text(encoding="utf-8")
+
+st.markdown(f"<style>{load_css()}</style>", unsafe_allow_html=True)
+
+@st.cache_resource
+def get_shared_agent(groq_api_key, model_name):
+    """Build one agent per model; sessions on that model share it and keep their own memory"""
+    agent = EcommerceAgent(groq_api_key=groq_api_key, lazy_fallback=False)
+    if agent.llm.model_name != model_name and not agent.switch_model(model_name):
+        raise ValueError(f"Failed to load model {model_name}")
+    return agent
 
 def initialize_session_state():
     """Initialize session state variables"""
@@ -115,6 +50,9 @@ def initialize_session_state():
     if "session_id" not in st.session_state:
         st.session_state.session_id = str(uuid.uuid4())
 
+    if "current_model" not in st.session_state:
+        st.session_state.current_model = DEFAULT_MODEL
+
     if "agent" not in st.session_state:
         # Check for Groq API key
         groq_api_key = os.getenv("GROQ_API_KEY")
@@ -126,32 +64,30 @@ def initialize_session_state():
         # Initialize agent with Groq
         try:
             with st.spinner("Initializing Groq AI model... This should be quick!"):
-                st.session_state.agent = EcommerceAgent(
-                    groq_api_key=groq_api_key,
-                )
+                st.session_state.agent = get_shared_agent(groq_api_key, st.session_state.current_model)
         except Exception as e:
             st.error(f"❌ Failed to initialize AI agent: {str(e)}")
             st.info("Please check your Groq API key and internet connection.")
             st.stop()
 
+    if "memory" not in st.session_state:
+        st.session_state.memory = st.session_state.agent.create_memory()
+
     if "customer_authenticated" not in st.session_state:
         st.session_state.customer_authenticated = False
 
     if "current_customer" not in st.session_state:
         st.session_state.current_customer = None
 
-    if "current_model" not in st.session_state:
-        st.session_state.current_model = "llama3-70b-8192"
-
-def display_message(role, content, timestamp=None):
-    """Display a chat message with styling"""
+def render_message_html(role, content, timestamp=None):
+    """Build the styled HTML for one chat message"""
     if timestamp is None:
         timestamp = datetime.now().strftime("%H:%M")
 
     avatar = "👤" if role == "user" else "🤖"
     css_class = "user" if role == "user" else "bot"
 
-    st.markdown(f"""
+    return f"""
     <div class="chat-message {css_class}">
         <div class="avatar">{avatar}</div>
         <div class="message">
@@ -161,22 +97,50 @@ def display_message(role, content, timestamp=None):
             <div>{content}</div>
         </div>
     </div>
-    """, unsafe_allow_html=True)
+    """
+
+def render_messages(messages):
+    """Display a list of chat messages as a single markdown element"""
+    st.markdown(
+        "".join(render_message_html(m["role"], m["content"]) for m in messages),
+        unsafe_allow_html=True
+    )
+
+def display_message(role, content, timestamp=None):
+    """Display a chat message with styling"""
+    st.markdown(render_message_html(role, content, timestamp), unsafe_allow_html=True)
+
+def format_error_message(e):
+    """Build a user-facing error message with a hint for common Groq errors"""
+    error_msg = f"⚠️ Sorry, I encountered an error: {str(e)}"
+    if "rate limit" in str(e).lower():
+        error_msg += "\n\n💡 You may have hit the API rate limit. Groq has generous free limits, please wait a moment and try again."
+    elif "authentication" in str(e).lower() or "api key" in str(e).lower():
+        error_msg += "\n\n🔑 Please check your Groq API key in the .env file."
+    elif "timeout" in str(e).lower():
+        error_msg += "\n\n⏱️ Request timed out. Please try again."
+    return error_msg
 
 def process_user_message(prompt, context):
     """Process user message and get AI response"""
     try:
         with st.spinner("🤖 Groq AI is thinking..."):
-            response = st.session_state.agent.process_message(prompt, context)
+            response = st.session_state.agent.process_message(
+                prompt, context, memory=st.session_state.memory
+            )
         return response
     except Exception as e:
-        error_msg = f"⚠️ Sorry, I encountered an error: {str(e)}"
-        if "rate limit" in str(e).lower():
-            error_msg += "\n\n💡 You may have hit the API rate limit. Groq has generous free limits, please wait a moment and try again."
-        elif "authentication" in str(e).lower() or "api key" in str(e).lower():
-            error_msg += "\n\n🔑 Please check your Groq API key in the .env file."
-        elif "timeout" in str(e).lower():
-            error_msg += "\n\n⏱️ Request timed out. Please try again."
+        return format_error_message(e)
+
+def stream_user_message(prompt, context):
+    """Stream the AI response into the page as tokens arrive; returns the full text"""
+    try:
+        return st.write_stream(
+            st.session_state.agent.stream_message(prompt, context, memory=st.session_state.memory)
+        )
+    except Exception as e:
+        error_msg = format_error_message(e)
+        st.markdown(error_msg)
         return error_msg
 
 def main():
@@ -209,13 +173,17 @@ def main():
         if selected_model != st.session_state.current_model:
             if st.button("🔄 Switch Model", use_container_width=True):
                 with st.spinner(f"Switching to {selected_model}..."):
-                    if st.session_state.agent.switch_model(selected_model):
+                    # Agents are shared per model, so switching only changes
+                    # which one this session talks to.
+                    try:
+                        st.session_state.agent = get_shared_agent(os.getenv("GROQ_API_KEY"), selected_model)
+                    except Exception:
+                        st.error("❌ Failed to switch model")
+                    else:
                         st.session_state.current_model = selected_model
                         st.success(f"✅ Switched to {selected_model}")
                         time.sleep(1)
                         st.rerun()
-                    else:
-                        st.error("❌ Failed to switch model")
 
         # Current model info
         model_info = {
@@ -239,7 +207,7 @@ def main():
                 customer_id = st.text_input("Customer ID", placeholder="e.g., CUST001")
                 if st.button("Login with ID", use_container_width=True):
                     if customer_id:
-                        customer_context_manager.set_customer_id(st.session_state.session_id, customer_id)
+                        customer_context_manager.set_field(st.session_state.session_id, "customer_id", customer_id)
                         st.session_state.current_customer = customer_id
                         st.session_state.customer_authenticated = True
                         st.rerun()
@@ -249,7 +217,7 @@ def main():
                 email = st.text_input("Email", placeholder="your.email@example.com")
                 if st.button("Login with Email", use_container_width=True):
                     if email and "@" in email:
-                        customer_context_manager.set_customer_email(st.session_state.session_id, email)
+                        customer_context_manager.set_field(st.session_state.session_id, "customer_email", email)
                         st.session_state.current_customer = email
                         st.session_state.customer_authenticated = True
                         st.rerun()
@@ -296,7 +264,7 @@ def main():
 
         if st.button("🗑️ Clear Chat", use_container_width=True):
             st.session_state.messages = []
-            st.session_state.agent.reset_conversation()
+            st.session_state.agent.reset_conversation(st.session_state.memory)
             st.success("Chat cleared!")
             time.sleep(1)
             st.rerun()
@@ -332,8 +300,19 @@ def main():
             </div>
             """, unsafe_allow_html=True)
         
-        for i, message in enumerate(st.session_state.messages):
-            display_message(message["role"], message["content"])
+        # Only the most recent window is rendered by default; older messages
+        # are built on demand (a collapsed expander would still send them).
+        messages = st.session_state.messages
+        older, recent = messages[:-VISIBLE_MESSAGES], messages[-VISIBLE_MESSAGES:]
+        # The label stays constant: Streamlit derives the widget id from it,
+        # so a changing count would reset the toggle after every turn.
+        if older:
+            show_older = st.toggle("Load older messages", key="show_older_messages")
+            st.caption(f"{len(older)} older messages")
+            if show_older:
+                render_messages(older)
+        if recent:
+            render_messages(recent)
 
     # Chat input
     if prompt := st.chat_input("Type your message here... 💬"):
@@ -344,14 +323,16 @@ def main():
         with chat_container:
             display_message("user", prompt)
 
-        # Get context and process message
+        # Get context and stream the response, then swap in the styled message
         context = customer_context_manager.get_context(st.session_state.session_id)
-        response = process_user_message(prompt, context)
+        with chat_container:
+            response_placeholder = st.empty()
+            with response_placeholder.container():
+                response = stream_user_message(prompt, context)
+            with response_placeholder.container():
+                display_message("assistant", response)
 
-        # Add and display assistant response
         st.session_state.messages.append({"role": "assistant", "content": response})
-        with chat_container:
-            display_message("assistant", response)
 
     # Help section
     with st.expander("💡 Sample Conversations & Tips"):
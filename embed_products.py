@@ -1,53 +1,104 @@
-from mockdatabase import MockOrderDatabase, MockProductDatabase, MockCustomerDatabase
+import hashlib
+import json
+import sys
+from pathlib import Path
 
+from mock_databases import order_db, product_db, customer_db
+
+VECTORSTORE_DIR = Path("vectorstore/products")
+MANIFEST_PATH = VECTORSTORE_DIR / "manifest.sha256"
+
+# Embedding model and index parameters; both go into the manifest hash, so
+# changing any of them forces a rebuild instead of reusing an incompatible index
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_NAMESPACE = "all-MiniLM-L6-v2"
+INDEX_CONFIG = {
+    "quantizer": "QT_8bit",
+    "metric": "METRIC_INNER_PRODUCT",
+    "hnsw_m": 32,
+    "ef_construction": 200,
+    "ef_search": 64,
+}
+
+# Record text is prebuilt by the databases; these just collect it
 def serialize_product_data():
-    db = MockProductDatabase()
-    documents = []
-    for product in db.products.values():
-        text = f"""Product Name: {product['name']}
-Category: {product['category']}
-Price: ${product['price']}
-Availability: {product['availability']}
-Description: {product['description']}
-Rating: {product['rating']}
-Features: {', '.join(product['features'])}"""
-        documents.append({"id": product["product_id"], "text": text})
-    return documents
+    return product_db.serialized_documents()
 
 def serialize_customer_data():
-    db = MockCustomerDatabase()
-    documents = []
-    for customer in db.customers.values():
-        text = f"""Customer Name: {customer['name']}
-Email: {customer['email']}
-Phone: {customer['phone']}
-Address: {customer['address']}
-Loyalty Tier: {customer['tier']}
-Preferences: Categories - {', '.join(customer['preferences']['categories'])}; Brands - {', '.join(customer['preferences']['brands'])}"""
-        documents.append({"id": customer["customer_id"], "text": text})
-    return documents
+    return customer_db.serialized_documents()
 
 def serialize_order_data():
-    db = MockOrderDatabase()
-    documents = []
-    for order in db.orders.values():
-        items = ', '.join([f"{item['quantity']}x {item['name']}" for item in order["items"]])
-        text = f"""Order ID: {order['order_id']}
-Customer ID: {order['customer_id']}
-Status: {order['status']}
-Items: {items}
-Total: ${order['total']}
-Shipping Address: {order['shipping_address']}
-Tracking: {order.get('tracking_number', 'None')}"""
-        documents.append({"id": order["order_id"], "text": text})
-    return documents
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.vectorstores import FAISS
+    return order_db.serialized_documents()
 
 documents = serialize_product_data() + serialize_customer_data() + serialize_order_data()
+
+# Nothing to do when the indexed records and build settings are unchanged since
+# the last build; checked before the embedding stack is even imported
+manifest_hash = hashlib.sha256(json.dumps({
+    "model": EMBEDDING_MODEL,
+    "namespace": EMBEDDING_NAMESPACE,
+    "index": INDEX_CONFIG,
+    "records": sorted((doc["id"], doc["text"]) for doc in documents),
+}, sort_keys=True).encode()).hexdigest()
+if MANIFEST_PATH.exists() and MANIFEST_PATH.read_text().strip() == manifest_hash:
+    print(f"{VECTORSTORE_DIR} is up to date")
+    sys.exit(0)
+
+import faiss
+import numpy as np
+from langchain.docstore.document import Document
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.embeddings import CacheBackedEmbeddings, HuggingFaceEmbeddings
+from langchain.storage import LocalFileStore
+from langchain.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
+
+def load_embeddings():
+    # Embed locally with a small sentence-transformers model (384 dims, no API
+    # calls), in batches of 64. Vectors are cached on disk by content hash, so
+    # re-runs only encode records whose text changed.
+    return CacheBackedEmbeddings.from_bytes_store(
+        HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            encode_kwargs={"batch_size": 64, "normalize_embeddings": True},
+        ),
+        LocalFileStore("./.cache/emb"),
+        namespace=EMBEDDING_NAMESPACE,
+    )
+
+embeddings = load_embeddings()
 texts = [doc["text"] for doc in documents]
 metadata = [{"id": doc["id"]} for doc in documents]
+vecs = embeddings.embed_documents(texts)
+
+# HNSW graph index instead of the default exhaustive IndexFlatL2, so query
+# cost stays logarithmic as the catalog grows. Vectors are normalized once
+# here, making inner product equal to cosine similarity, and stored as
+# 8-bit scalar-quantized codes (1 byte per dimension instead of 4). One
+# contiguous float32 matrix is handed to FAISS, so it never converts rows.
+arr = np.ascontiguousarray(np.asarray(vecs, dtype=np.float32))
+faiss.normalize_L2(arr)
+index = faiss.IndexHNSWSQ(
+    arr.shape[1],
+    getattr(faiss.ScalarQuantizer, INDEX_CONFIG["quantizer"]),
+    INDEX_CONFIG["hnsw_m"],
+    getattr(faiss, INDEX_CONFIG["metric"]),
+)
+index.hnsw.efConstruction = INDEX_CONFIG["ef_construction"]
+index.train(arr)
+index.add(arr)
+index.hnsw.efSearch = INDEX_CONFIG["ef_search"]
 
-embeddings = OpenAIEmbeddings()
-vectorstore = FAISS.from_texts(texts, embedding=embeddings, metadatas=metadata)
-vectorstore.save_local("vectorstore/products")
+ids = [doc["id"] for doc in documents]
+vectorstore = FAISS(
+    embedding_function=embeddings,
+    index=index,
+    docstore=InMemoryDocstore({
+        doc_id: Document(page_content=text, metadata=meta)
+        for doc_id, text, meta in zip(ids, texts, metadata)
+    }),
+    index_to_docstore_id=dict(enumerate(ids)),
+    distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+)
+vectorstore.save_local(str(VECTORSTORE_DIR))
+MANIFEST_PATH.write_text(manifest_hash)
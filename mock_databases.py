@@ -1,99 +1,103 @@
 """
 Mock database classes for the e-commerce chatbot
 """
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Mapping, Optional, Set, Tuple, Union
 import random
+import re
+from pathlib import Path
+from types import MappingProxyType
+
+import numpy as np
+import orjson
+
+DATA_DIR = Path(__file__).parent / "data"
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Products returned per recommendation request
+_RECOMMENDATION_LIMIT = 5
+
+def _tokens(text: str) -> Set[str]:
+    """Lowercase alphanumeric words in text"""
+    return set(_TOKEN_RE.findall(text.lower()))
+
+def _load_records(name: str) -> Dict[str, Dict]:
+    """Load a mock table from data/<name>.json"""
+    return orjson.loads((DATA_DIR / f"{name}.json").read_bytes())
+
+@dataclass(slots=True, frozen=True)
+class Product:
+    """Catalog entry"""
+    product_id: str
+    name: str
+    category: str
+    price: float
+    availability: str
+    stock_count: int
+    description: str
+    rating: float
+    features: Tuple[str, ...] = ()
+
+# Text layouts for the records embedded into the vectorstore
+_PRODUCT_TPL = (
+    "Product Name: {}\nCategory: {}\nPrice: ${}\nAvailability: {}\n"
+    "Description: {}\nRating: {}\nFeatures: {}"
+).format
+_CUSTOMER_TPL = (
+    "Customer Name: {}\nEmail: {}\nPhone: {}\nAddress: {}\nLoyalty Tier: {}\n"
+    "Preferences: Categories - {}; Brands - {}"
+).format
+_ORDER_TPL = (
+    "Order ID: {}\nCustomer ID: {}\nStatus: {}\nItems: {}\nTotal: ${}\n"
+    "Shipping Address: {}\nTracking: {}"
+).format
+_ITEM_FMT = "{}x {}".format
+
+def _product_text(product: Product) -> str:
+    return _PRODUCT_TPL(
+        product.name, product.category, product.price, product.availability,
+        product.description, product.rating, ', '.join(product.features)
+    )
+
+def _customer_text(customer: Dict) -> str:
+    preferences = customer['preferences']
+    return _CUSTOMER_TPL(
+        customer['name'], customer['email'], customer['phone'], customer['address'], customer['tier'],
+        ', '.join(preferences['categories']), ', '.join(preferences['brands'])
+    )
+
+def _order_text(order: Dict) -> str:
+    items = ', '.join(_ITEM_FMT(item['quantity'], item['name']) for item in order["items"])
+    return _ORDER_TPL(
+        order['order_id'], order['customer_id'], order['status'], items, order['total'],
+        order['shipping_address'], order.get('tracking_number', 'None')
+    )
 
 class MockOrderDatabase:
     """Mock order management system"""
     
     def __init__(self):
-        self.orders = {
-            "ORD001": {
-                "order_id": "ORD001",
-                "customer_id": "CUST001",
-                "status": "shipped",
-                "items": [
-                    {"product_id": "PROD001", "name": "Wireless Headphones", "quantity": 1, "price": 99.99}
-                ],
-                "total": 99.99,
-                "order_date": "2024-01-15",
-                "shipping_address": "123 Main St, New York, NY",
-                "tracking_number": "TRK123456789",
-                "can_cancel": False
-            },
-            "ORD002": {
-                "order_id": "ORD002",
-                "customer_id": "CUST001",
-                "status": "processing",
-                "items": [
-                    {"product_id": "PROD002", "name": "Smart Watch", "quantity": 1, "price": 249.99},
-                    {"product_id": "PROD003", "name": "Phone Case", "quantity": 2, "price": 19.99}
-                ],
-                "total": 289.97,
-                "order_date": "2024-01-20",
-                "shipping_address": "123 Main St, New York, NY",
-                "tracking_number": None,
-                "can_cancel": True
-            },
-            "ORD003": {
-                "order_id": "ORD003",
-                "customer_id": "CUST002",
-                "status": "delivered",
-                "items": [
-                    {"product_id": "PROD004", "name": "Laptop Stand", "quantity": 1, "price": 45.99}
-                ],
-                "total": 45.99,
-                "order_date": "2024-01-10",
-                "shipping_address": "456 Oak Ave, Los Angeles, CA",
-                "tracking_number": "TRK987654321",
-                "can_cancel": False
-            },
-            "ORD004": {
-                "order_id": "ORD004",
-                "customer_id": "CUST003",
-                "status": "processing",
-                "items": [
-                    {"product_id": "PROD005", "name": "Winter Jacket", "quantity": 1, "price": 89.99}
-                ],
-                "total": 89.99,
-                "order_date": "2024-01-22",
-                "shipping_address": "789 Pine Rd, Chicago, IL",
-                "tracking_number": None,
-                "can_cancel": True
-            },
-            "ORD005": {
-                "order_id": "ORD005",
-                "customer_id": "CUST004",
-                "status": "delivered",
-                "items": [
-                    {"product_id": "PROD006", "name": "Gaming Mouse", "quantity": 1, "price": 59.99}
-                ],
-                "total": 59.99,
-                "order_date": "2024-01-18",
-                "shipping_address": "321 Elm St, Houston, TX",
-                "tracking_number": "TRK2468101214",
-                "can_cancel": False
-            },
-            "ORD006": {
-                "order_id": "ORD006",
-                "customer_id": "CUST005",
-                "status": "processing",
-                "items": [
-                    {"product_id": "PROD007", "name": "Bluetooth Speaker", "quantity": 2, "price": 34.99}
-                ],
-                "total": 69.98,
-                "order_date": "2024-01-21",
-                "shipping_address": "654 Maple Ln, Miami, Florida",
-                "tracking_number": None,
-                "can_cancel": True
-            }
-        }
+        self.orders = _load_records("orders")
+        # Read-only views handed to callers; writes go through the methods below
+        self._views = {oid: MappingProxyType(o) for oid, o in self.orders.items()}
+        
+        self._serialized = {oid: _order_text(o) for oid, o in self.orders.items()}
     
-    def get_order_status(self, order_id: str) -> Optional[Dict]:
+    def serialized_documents(self) -> List[Dict]:
+        """Get the embeddable text of every order"""
+        return [{"id": oid, "text": text} for oid, text in self._serialized.items()]
+    
+    def get_order_status(self, order_id: str) -> Optional[Mapping]:
         """Get order status by order ID"""
-        return self.orders.get(order_id)
+        return self._views.get(order_id)
+    
+    def get_orders_status(self, order_ids: List[str]) -> Dict[str, Mapping]:
+        """Get several orders in one call, keyed by order ID; unknown IDs are skipped"""
+        views = self._views
+        return {oid: views[oid] for oid in order_ids if oid in views}
     
     def cancel_order(self, order_id: str) -> Dict[str, Union[bool, str]]:
         """Cancel an order if possible"""
@@ -104,8 +108,9 @@ class MockOrderDatabase:
         if not order["can_cancel"]:
             return {"success": False, "message": "Order cannot be cancelled (already shipped/delivered)"}
         
-        order["status"] = "cancelled"
-        order["can_cancel"] = False
+        # Single update call so readers never see a half-cancelled order
+        order.update(status="cancelled", can_cancel=False)
+        self._serialized[order_id] = _order_text(order)
         return {"success": True, "message": "Order cancelled successfully"}
     
     def process_return(self, order_id: str, reason: str = "") -> Dict[str, Union[bool, str]]:
@@ -128,253 +133,161 @@ class MockProductDatabase:
     
     def __init__(self):
         self.products = {
-            "PROD001": {
-                "product_id": "PROD001",
-                "name": "Wireless Headphones",
-                "category": "Electronics",
-                "price": 99.99,
-                "availability": "in_stock",
-                "stock_count": 25,
-                "description": "High-quality wireless headphones with noise cancellation",
-                "rating": 4.5,
-                "features": ["Bluetooth 5.0", "30-hour battery", "Active noise cancellation"]
-            },
-            "PROD002": {
-                "product_id": "PROD002",
-                "name": "Smart Watch",
-                "category": "Electronics",
-                "price": 249.99,
-                "availability": "in_stock",
-                "stock_count": 12,
-                "description": "Feature-rich smartwatch with health monitoring",
-                "rating": 4.3,
-                "features": ["Heart rate monitor", "GPS", "Water resistant", "7-day battery"]
-            },
-            "PROD003": {
-                "product_id": "PROD003",
-                "name": "Phone Case",
-                "category": "Accessories",
-                "price": 19.99,
-                "availability": "in_stock",
-                "stock_count": 100,
-                "description": "Durable protective phone case",
-                "rating": 4.1,
-                "features": ["Drop protection", "Wireless charging compatible", "Clear design"]
-            },
-            "PROD004": {
-                "product_id": "PROD004",
-                "name": "Laptop Stand",
-                "category": "Office",
-                "price": 45.99,
-                "availability": "low_stock",
-                "stock_count": 3,
-                "description": "Adjustable laptop stand for ergonomic working",
-                "rating": 4.7,
-                "features": ["Adjustable height", "Foldable", "Heat dissipation", "Universal compatibility"]
-            },
-            "PROD005": {
-                "product_id": "PROD005",
-                "name": "Winter Jacket",
-                "category": "Clothing",
-                "price": 89.99,
-                "availability": "in_stock",
-                "stock_count": 15,
-                "description": "Warm and waterproof winter jacket",
-                "rating": 4.4,
-                "features": ["Waterproof", "Insulated", "Multiple pockets", "Wind resistant"]
-            },
-            "PROD006": {
-                "product_id": "PROD006",
-                "name": "Gaming Mouse",
-                "category": "Electronics",
-                "price": 59.99,
-                "availability": "in_stock",
-                "stock_count": 40,
-                "description": "Ergonomic gaming mouse with customizable buttons",
-                "rating": 4.6,
-                "features": ["RGB lighting", "High precision sensor", "Wireless and wired modes"]
-            },
-            "PROD007": {
-                "product_id": "PROD007",
-                "name": "Bluetooth Speaker",
-                "category": "Electronics",
-                "price": 34.99,
-                "availability": "in_stock",
-                "stock_count": 50,
-                "description": "Portable Bluetooth speaker with rich bass",
-                "rating": 4.2,
-                "features": ["Water resistant", "12-hour battery", "Compact design"]
-            },
-            "PROD008": {
-                "product_id": "PROD008",
-                "name": "Desk Lamp",
-                "category": "Office",
-                "price": 29.99,
-                "availability": "in_stock",
-                "stock_count": 20,
-                "description": "LED desk lamp with adjustable brightness",
-                "rating": 4.0,
-                "features": ["Adjustable brightness", "Touch control", "Energy efficient"]
-            },
-            "PROD009": {
-                "product_id": "PROD009",
-                "name": "Running Shoes",
-                "category": "Clothing",
-                "price": 75.99,
-                "availability": "in_stock",
-                "stock_count": 30,
-                "description": "Lightweight running shoes for everyday use",
-                "rating": 4.3,
-                "features": ["Breathable material", "Cushioned sole", "Durable outsole"]
-            },
-            "PROD010": {
-                "product_id": "PROD010",
-                "name": "Coffee Mug",
-                "category": "Accessories",
-                "price": 14.99,
-                "availability": "in_stock",
-                "stock_count": 60,
-                "description": "Ceramic coffee mug with a sleek design",
-                "rating": 4.5,
-                "features": ["Microwave safe", "Dishwasher safe", "350ml capacity"]
-            }
+            pid: Product(**{**record, "features": tuple(record["features"])})
+            for pid, record in _load_records("products").items()
         }
+        
+        self._serialized = {pid: _product_text(p) for pid, p in self.products.items()}
+        
+        # Lowercased lookup tables so searches don't re-normalize every product
+        self._by_category = defaultdict(list)
+        self._name_rows = []
+        self._name_rows_by_category = defaultdict(list)
+        for product in self.products.values():
+            category_lower = product.category.lower()
+            row = (product.name.lower(), product)
+            self._by_category[category_lower].append(product)
+            self._name_rows.append(row)
+            self._name_rows_by_category[category_lower].append(row)
+        
+        # Keyword -> products index over names and features, used for
+        # weather-based recommendations
+        self._by_feature_kw = defaultdict(list)
+        for product in self.products.values():
+            for keyword in _tokens(" ".join([product.name, *product.features])):
+                self._by_feature_kw[keyword].append(product)
+        
+        # Trigram -> product ids over lowercased names. A name containing the
+        # query contains every trigram of it, so intersecting their postings
+        # narrows the substring match to a few candidates; catalog positions
+        # keep hits in a stable order.
+        self._name_trigrams = defaultdict(set)
+        for name_lower, product in self._name_rows:
+            for i in range(len(name_lower) - 2):
+                self._name_trigrams[name_lower[i:i + 3]].add(product.product_id)
+        self._category_ids = {
+            category: {p.product_id for p in products} for category, products in self._by_category.items()
+        }
+        self._rank = {pid: i for i, pid in enumerate(self.products)}
+        
+        # Parallel arrays over the catalog for vectorized ranking, with a
+        # boolean mask per recommendation pool
+        self._pids = list(self.products)
+        self._ratings = np.fromiter(
+            (p.rating for p in self.products.values()), dtype=np.float32, count=len(self._pids)
+        )
+        self._cat_masks = {category: self._mask(products) for category, products in self._by_category.items()}
+        self._cold_mask = self._mask(self._by_feature_kw.get("winter", []) + self._by_category.get("clothing", []))
+        self._rain_mask = self._mask(self._by_feature_kw.get("waterproof", []))
+        self._top_rated = self._top_rated_products(_RECOMMENDATION_LIMIT)
     
-    def search_products(self, query: str, category: str = None) -> List[Dict]:
+    def search_products(self, query: str, category: str = None) -> List[Product]:
         """Search products by name or category"""
-        results = []
         query_lower = query.lower()
+        if len(query_lower) >= 3:
+            trigrams = {query_lower[i:i + 3] for i in range(len(query_lower) - 2)}
+            postings = sorted((self._name_trigrams.get(trigram, set()) for trigram in trigrams), key=len)
+            candidates = set.intersection(*postings)
+            if category:
+                candidates &= self._category_ids.get(category.lower(), set())
+            products = (self.products[pid] for pid in sorted(candidates, key=self._rank.__getitem__))
+            return [product for product in products if query_lower in product.name.lower()]
         
-        for product in self.products.values():
-            match = False
-            
-            # Check name match
-            if query_lower in product["name"].lower():
-                match = True
-            
-            # Check category match if specified
-            if category and category.lower() != product["category"].lower():
-                match = False
-            
-            if match:
-                results.append(product)
-        
-        return results
+        # Too short for trigrams: scan the names
+        rows = self._name_rows_by_category.get(category.lower(), []) if category else self._name_rows
+        return [product for name_lower, product in rows if query_lower in name_lower]
+    
+    def serialized_documents(self) -> List[Dict]:
+        """Get the embeddable text of every product"""
+        return [{"id": pid, "text": text} for pid, text in self._serialized.items()]
+    
+    def _mask(self, products: List[Product]) -> np.ndarray:
+        mask = np.zeros(len(self._pids), dtype=bool)
+        mask[[self._rank[p.product_id] for p in products]] = True
+        return mask
+    
+    def _top_rated_products(self, k: int, mask: Optional[np.ndarray] = None) -> List[Product]:
+        """Top-k products by rating, optionally among a mask, ties kept in catalog order"""
+        ratings = self._ratings
+        if mask is not None:
+            ratings = np.where(mask, ratings, -np.inf)
+            k = min(k, int(np.count_nonzero(mask)))
+        k = min(k, len(self._pids))
+        if k == 0:
+            return []
+        threshold = np.partition(ratings, -k)[-k]
+        candidates = np.flatnonzero(ratings >= threshold)
+        ranked = candidates[np.argsort(-ratings[candidates], kind="stable")][:k]
+        return [self.products[self._pids[i]] for i in ranked]
     
-    def get_product_details(self, product_id: str) -> Optional[Dict]:
+    def get_product_details(self, product_id: str) -> Optional[Product]:
         """Get detailed product information"""
         return self.products.get(product_id)
     
-    def get_recommendations(self, category: str = None, weather_condition: str = None) -> List[Dict]:
-        """Get product recommendations based on category or weather"""
-        recommendations = []
+    def get_recommendations(self, category: str = None, weather_condition: str = None) -> List[Product]:
+        """Get the best-rated product recommendations based on category or weather"""
+        mask = None
         
         if weather_condition:
-            if "cold" in weather_condition.lower() or "winter" in weather_condition.lower():
+            weather_lower = weather_condition.lower()
+            if "cold" in weather_lower or "winter" in weather_lower:
                 # Recommend winter items
-                recommendations = [p for p in self.products.values() if "winter" in p["name"].lower() or p["category"].lower() == "clothing"]
-            elif "rain" in weather_condition.lower():
+                mask = self._cold_mask
+            elif "rain" in weather_lower:
                 # Recommend waterproof items
-                recommendations = [p for p in self.products.values() if any("waterproof" in f.lower() for f in p.get("features", []))]
+                mask = self._rain_mask
         
-        if not recommendations and category:
-            recommendations = [p for p in self.products.values() if p["category"].lower() == category.lower()]
+        if (mask is None or not mask.any()) and category:
+            mask = self._cat_masks.get(category.lower())
         
-        if not recommendations:
+        if mask is None or not mask.any():
             # Default recommendations (top rated)
-            recommendations = sorted(self.products.values(), key=lambda x: x["rating"], reverse=True)[:3]
+            return list(self._top_rated)
         
-        return recommendations
+        return self._top_rated_products(_RECOMMENDATION_LIMIT, mask)
 
 class MockCustomerDatabase:
     """Mock customer database"""
     
-    def __init__(self):
-        self.customers = {
-            "CUST001": {
-                "customer_id": "CUST001",
-                "name": "John Doe",
-                "email": "john.doe@email.com",
-                "phone": "+1-555-0123",
-                "address": "123 Main St, New York, NY",
-                "loyalty_points": 1250,
-                "tier": "Gold",
-                "preferences": {
-                    "categories": ["Electronics", "Books"],
-                    "brands": ["TechBrand", "BookCorp"],
-                    "communication": "email"
-                },
-                "order_history": ["ORD001", "ORD002"]
-            },
-            "CUST002": {
-                "customer_id": "CUST002",
-                "name": "Jane Smith",
-                "email": "jane.smith@email.com",
-                "phone": "+1-555-0456",
-                "address": "456 Oak Ave, Los Angeles, CA",
-                "loyalty_points": 750,
-                "tier": "Silver",
-                "preferences": {
-                    "categories": ["Home", "Office"],
-                    "brands": ["HomePlus", "OfficeMax"],
-                    "communication": "sms"
-                },
-                "order_history": ["ORD003"]
-            },
-            "CUST003": {
-                "customer_id": "CUST003",
-                "name": "Alice Johnson",
-                "email": "alice.johnson@email.com",
-                "phone": "+1-555-0789",
-                "address": "789 Pine Rd, Chicago, Illinois",
-                "loyalty_points": 300,
-                "tier": "Bronze",
-                "preferences": {
-                    "categories": ["Clothing", "Accessories"],
-                    "brands": ["Fashionista", "Accents"],
-                    "communication": "email"
-                },
-                "order_history": ["ORD004"]
-            },
-            "CUST004": {
-                "customer_id": "CUST004",
-                "name": "Bob Brown",
-                "email": "bob.brown@email.com",
-                "phone": "+1-555-0110",
-                "address": "321 Elm St, Houston, Texas",
-                "loyalty_points": 980,
-                "tier": "Gold",
-                "preferences": {
-                    "categories": ["Electronics", "Gaming"],
-                    "brands": ["GamePro", "TechBrand"],
-                    "communication": "sms"
-                },
-                "order_history": ["ORD005"]
-            },
-            "CUST005": {
-                "customer_id": "CUST005",
-                "name": "Carol White",
-                "email": "carol.white@email.com",
-                "phone": "+1-555-0222",
-                "address": "654 Maple Ln, Miami, Florida",
-                "loyalty_points": 450,
-                "tier": "Silver",
-                "preferences": {
-                    "categories": ["Electronics", "Home"],
-                    "brands": ["HomePlus", "SoundMaster"],
-                    "communication": "email"
-                },
-                "order_history": ["ORD006"]
-            }
-        }
+    def __init__(self, order_db: Optional[MockOrderDatabase] = None):
+        self.customers = _load_records("customers")
+        self._views = {cid: MappingProxyType(c) for cid, c in self.customers.items()}
+        self.order_db = order_db
+        
+        # Secondary index for case-insensitive email lookups
+        self._by_email = {c["email"].lower(): c for c in self._views.values()}
+        
+        self._serialized = {cid: _customer_text(c) for cid, c in self.customers.items()}
+    
+    def serialized_documents(self) -> List[Dict]:
+        """Get the embeddable text of every customer"""
+        return [{"id": cid, "text": text} for cid, text in self._serialized.items()]
     
-    def get_customer_info(self, customer_id: str) -> Optional[Dict]:
+    def get_customer_info(self, customer_id: str) -> Optional[Mapping]:
         """Get customer information"""
-        return self.customers.get(customer_id)
+        return self._views.get(customer_id)
     
-    def get_customer_by_email(self, email: str) -> Optional[Dict]:
+    def get_customer_by_email(self, email: str) -> Optional[Mapping]:
         """Get customer by email"""
-        for customer in self.customers.values():
-            if customer["email"].lower() == email.lower():
-                return customer
-        return None
+        return self._by_email.get(email.lower())
+    
+    def _with_orders(self, customer: Optional[Mapping]) -> Tuple[Optional[Mapping], List[Tuple[str, Optional[Mapping]]]]:
+        if not customer:
+            return None, []
+        # Duplicate IDs are fetched and listed once, first occurrence wins
+        order_ids = list(dict.fromkeys(customer.get('order_history', [])))
+        orders = self.order_db.get_orders_status(order_ids) if self.order_db else {}
+        return customer, [(oid, orders.get(oid)) for oid in order_ids]
+    
+    def get_customer_with_orders(self, customer_id: str) -> Tuple[Optional[Mapping], List[Tuple[str, Optional[Mapping]]]]:
+        """Get a customer and their order history as (order_id, order or None) pairs"""
+        return self._with_orders(self._views.get(customer_id))
+    
+    def get_customer_with_orders_by_email(self, email: str) -> Tuple[Optional[Mapping], List[Tuple[str, Optional[Mapping]]]]:
+        """Get a customer by email and their order history as (order_id, order or None) pairs"""
+        return self._with_orders(self._by_email.get(email.lower()))
+
+# Shared instances, so the mock data is built once per process
+order_db = MockOrderDatabase()
+product_db = MockProductDatabase()
+customer_db = MockCustomerDatabase(order_db)
@@ -21,6 +21,9 @@ WEATHER_API_KEY=your_weather_api_key_here
 # Application Configuration
 APP_NAME=E-Commerce Customer Service Bot
 DEBUG=True
+
+# Terse key=value tool replies (fewer tokens per agent step)
+TOOLS_COMPACT_OUTPUT=0
 """)
         print("✅ .env file created. Please add your API keys.")
     else:
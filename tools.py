@@ -1,20 +1,89 @@
 """
 Tool implementations for the e-commerce chatbot
 """
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
 from typing import Type
+import hashlib
 import json
-import requests
+import logging
+import threading
+import orjson
+from cachetools import LRUCache, TTLCache
 from typing import Dict, List, Any, Optional
 from langchain.tools import BaseTool
 from pydantic import BaseModel, Field
-from mock_databases import MockOrderDatabase, MockProductDatabase, MockCustomerDatabase
+from mock_databases import order_db, product_db, customer_db
 import os
 from datetime import datetime
 
-# Initialize mock databases
-order_db = MockOrderDatabase()
-product_db = MockProductDatabase()
-customer_db = MockCustomerDatabase()
+logger = logging.getLogger(__name__)
+
+# Mock weather conditions, and the conditions (mock or OpenWeather "main"
+# group) that don't delay shipping
+_WEATHER_CONDITIONS = ("sunny", "rainy", "cloudy", "snowy", "windy")
+_GOOD_SHIPPING = frozenset({"sunny", "cloudy", "clear", "clouds"})
+
+# Display labels for product availability codes
+_AVAIL_LABELS = {code: code.replace('_', ' ').title() for code in ("in_stock", "low_stock", "out_of_stock", "pre_order")}
+
+# Display labels for order statuses, and the per-order line in order lists
+_STATUS_LABELS = {s: s.title() for s in ("pending", "processing", "shipped", "delivered", "cancelled", "returned")}
+_ORDER_ROW = "Order {}: {} - ${:.2f} (Date: {})".format
+
+# Most recent order IDs listed in a customer info reply
+_RECENT_ORDERS_SHOWN = 10
+
+def _status_label(status: str) -> str:
+    return _STATUS_LABELS.get(status) or status.title()
+
+def _stable_hash(text: str) -> int:
+    """Process-independent hash, unlike the salted built-in hash()"""
+    return int.from_bytes(hashlib.blake2b(text.strip().lower().encode(), digest_size=4).digest(), "little")
+
+def _availability_label(code: str) -> str:
+    return _AVAIL_LABELS.get(code) or code.replace('_', ' ').title()
+
+def _compact_output() -> bool:
+    """Whether TOOLS_COMPACT_OUTPUT=1 asks for terse key=value tool replies"""
+    return os.getenv("TOOLS_COMPACT_OUTPUT") == "1"
+
+def _compact(fields: Dict[str, Any]) -> str:
+    """Render fields as a single 'k=v;k=v' RESULT line, skipping empty values"""
+    return "RESULT: " + ";".join(f"{k}={v}" for k, v in fields.items() if v not in (None, ""))
+
+# Per-turn lookup memo; each agent turn sets its own dict, so concurrent
+# sessions never read each other's results and nothing outlives the turn.
+_turn_cache: ContextVar[Optional[Dict[tuple, str]]] = ContextVar("_turn_cache", default=None)
+
+@contextmanager
+def with_turn_cache():
+    """Memoize read-tool lookups for the duration of one agent turn"""
+    token = _turn_cache.set({})
+    try:
+        yield
+    finally:
+        _turn_cache.reset(token)
+
+def _turn_memoized(func):
+    """Cache func's result in the current turn's cache; no-op outside a turn"""
+    @wraps(func)
+    def wrapper(*args):
+        cache = _turn_cache.get()
+        if cache is None:
+            return func(*args)
+        key = (func.__name__, *args)
+        if key not in cache:
+            cache[key] = func(*args)
+        return cache[key]
+    return wrapper
+
+def _invalidate_read_caches():
+    """Drop this turn's cached lookups after a write tool changes the data"""
+    cache = _turn_cache.get()
+    if cache is not None:
+        cache.clear()
 
 class OrderStatusInput(BaseModel):
     order_id: str = Field(description="The order ID to check status for")
@@ -54,33 +123,49 @@ class RecommendationInput(BaseModel):
     category: Optional[str] = Field(description="Product category", default=None)
     weather_condition: Optional[str] = Field(description="Current weather condition", default=None)
 
+class AskQueryInput(BaseModel):
+    """No arguments; present so the tool binds as an empty JSON-schema function"""
+
+@_turn_memoized
+def _cached_order_status(order_id: str) -> str:
+    order = order_db.get_order_status(order_id)
+    if not order:
+        return f"RESULT: Order {order_id} not found. This order ID does not exist in our system. Please verify the order ID or ask the customer for their email to search for orders differently."
+    
+    if _compact_output():
+        return _compact({
+            "order_id": order['order_id'],
+            "status": _status_label(order['status']),
+            "date": order['order_date'],
+            "total": f"{order['total']:.2f}",
+            "items": ",".join(f"{item['quantity']}x {item['name']} @{item['price']:.2f}" for item in order['items']),
+            "ship_to": order['shipping_address'],
+            "tracking": order['tracking_number'],
+        })
+    
+    lines = [
+        "FINAL ANSWER: Order Details Found",
+        f"Order ID: {order['order_id']}",
+        f"Status: {_status_label(order['status'])}",
+        f"Order Date: {order['order_date']}",
+        f"Total: ${order['total']:.2f}",
+        "Items:",
+    ]
+    lines.extend(f"  - {item['name']} (Qty: {item['quantity']}) - ${item['price']:.2f}" for item in order['items'])
+    lines.append(f"Shipping Address: {order['shipping_address']}")
+    
+    if order['tracking_number']:
+        lines.append(f"Tracking Number: {order['tracking_number']}")
+    
+    return "\n".join(lines)
+
 class OrderStatusTool(BaseTool):
     name: str = "order_status"
     description: str = "Check the status of an order by order ID. Use this when customers ask about their order status, tracking, or delivery information."
     args_schema: Type[BaseModel] = OrderStatusInput
 
     def _run(self, order_id: str) -> str:
-        order = order_db.get_order_status(order_id)
-        if not order:
-            return f"RESULT: Order {order_id} not found. This order ID does not exist in our system. Please verify the order ID or ask the customer for their email to search for orders differently."
-        
-        status_info = f"""
-FINAL ANSWER: Order Details Found
-Order ID: {order['order_id']}
-Status: {order['status'].title()}
-Order Date: {order['order_date']}
-Total: ${order['total']:.2f}
-Items:
-"""
-        for item in order['items']:
-            status_info += f"  - {item['name']} (Qty: {item['quantity']}) - ${item['price']:.2f}\n"
-        
-        status_info += f"Shipping Address: {order['shipping_address']}\n"
-        
-        if order['tracking_number']:
-            status_info += f"Tracking Number: {order['tracking_number']}\n"
-        
-        return status_info.strip()
+        return _cached_order_status(order_id)
 
 class OrderCancelTool(BaseTool):
     name: str = "cancel_order"
@@ -89,6 +174,8 @@ class OrderCancelTool(BaseTool):
     
     def _run(self, order_id: str) -> str:
         result = order_db.cancel_order(order_id)
+        if result["success"]:
+            _invalidate_read_caches()
         return f"RESULT: {result['message']}"
 
 class ReturnProcessTool(BaseTool):
@@ -100,27 +187,69 @@ class ReturnProcessTool(BaseTool):
         result = order_db.process_return(order_id, reason)
         return f"RESULT: {result['message']}"
 
+@_turn_memoized
+def _cached_product_search(query: str, category: str) -> str:
+    products = product_db.search_products(query, category)
+    
+    if not products:
+        return f"RESULT: No products found for '{query}'" + (f" in category '{category}'" if category else "") + ". You might want to try different search terms or browse our categories."
+    
+    parts = [f"RESULT: Found {len(products)} product(s):"]
+    for product in products:
+        parts.append(
+            f"**{product.name}** (ID: {product.product_id})\n"
+            f"Category: {product.category}\n"
+            f"Price: ${product.price:.2f}\n"
+            f"Availability: {_availability_label(product.availability)}\n"
+            f"Rating: {product.rating}/5.0\n"
+            f"Description: {product.description}"
+        )
+    
+    return "\n\n".join(parts)
+
 class ProductSearchTool(BaseTool):
     name: str = "search_products"
     description: str = "Search for products by name or category. Use this when customers are looking for specific products or browsing categories."
     args_schema: Type[BaseModel] = ProductSearchInput
     
     def _run(self, query: str, category: str = None) -> str:
-        products = product_db.search_products(query, category)
-        
-        if not products:
-            return f"RESULT: No products found for '{query}'" + (f" in category '{category}'" if category else "") + ". You might want to try different search terms or browse our categories."
-        
-        result = f"RESULT: Found {len(products)} product(s):\n\n"
-        for product in products:
-            result += f"**{product['name']}** (ID: {product['product_id']})\n"
-            result += f"Category: {product['category']}\n"
-            result += f"Price: ${product['price']:.2f}\n"
-            result += f"Availability: {product['availability'].replace('_', ' ').title()}\n"
-            result += f"Rating: {product['rating']}/5.0\n"
-            result += f"Description: {product['description']}\n\n"
-        
-        return result.strip()
+        return _cached_product_search(query.lower().strip(), category or "")
+
+@_turn_memoized
+def _cached_product_details(product_id: str) -> str:
+    product = product_db.get_product_details(product_id)
+    
+    if not product:
+        return f"RESULT: Product {product_id} not found. This product ID does not exist in our catalog."
+    
+    if _compact_output():
+        return _compact({
+            "product_id": product.product_id,
+            "name": product.name,
+            "category": product.category,
+            "price": f"{product.price:.2f}",
+            "availability": _availability_label(product.availability),
+            "stock": product.stock_count,
+            "rating": product.rating,
+            "description": product.description,
+            "features": ",".join(product.features),
+        })
+    
+    lines = [
+        "RESULT: Product Details Found",
+        f"**{product.name}** (ID: {product.product_id})",
+        f"Category: {product.category}",
+        f"Price: ${product.price:.2f}",
+        f"Availability: {_availability_label(product.availability)}",
+        f"Stock: {product.stock_count} units",
+        f"Rating: {product.rating}/5.0",
+        f"Description: {product.description}",
+        "",
+        "Features:",
+    ]
+    lines.extend(f"  • {feature}" for feature in product.features)
+    
+    return "\n".join(lines)
 
 class ProductDetailsTool(BaseTool):
     name: str = "product_details"
@@ -128,27 +257,69 @@ class ProductDetailsTool(BaseTool):
     args_schema: Type[BaseModel] = ProductDetailsInput
     
     def _run(self, product_id: str) -> str:
-        product = product_db.get_product_details(product_id)
-        
-        if not product:
-            return f"RESULT: Product {product_id} not found. This product ID does not exist in our catalog."
-        
-        details = f"""
-RESULT: Product Details Found
-**{product['name']}** (ID: {product['product_id']})
-Category: {product['category']}
-Price: ${product['price']:.2f}
-Availability: {product['availability'].replace('_', ' ').title()}
-Stock: {product['stock_count']} units
-Rating: {product['rating']}/5.0
-Description: {product['description']}
-
-Features:
-"""
-        for feature in product['features']:
-            details += f"  • {feature}\n"
-        
-        return details.strip()
+        return _cached_product_details(product_id)
+
+@_turn_memoized
+def _cached_customer_info(customer_id: str, email: str) -> str:
+    if customer_id:
+        customer = customer_db.get_customer_info(customer_id)
+    elif email:
+        customer = customer_db.get_customer_by_email(email)
+    else:
+        return "RESULT: Error - Please provide either customer ID or email address."
+    
+    if not customer:
+        if customer_id:
+            return f"RESULT: Customer ID {customer_id} not found in our system. This customer ID does not exist. Try asking the customer for their email address instead or use the get_customer_orders tool to search for their orders directly."
+        else:
+            return f"RESULT: No customer found with email {email}. This email is not registered in our system."
+    
+    preferences = customer.get('preferences') or {}
+    category_list = preferences.get('categories') or ()
+    brand_list = preferences.get('brands') or ()
+    communication = preferences.get('communication')
+    recent_order_list = customer.get('order_history', [])[-_RECENT_ORDERS_SHOWN:]
+    
+    if _compact_output():
+        return _compact({
+            "name": customer['name'],
+            "email": customer['email'],
+            "phone": customer['phone'],
+            "address": customer['address'],
+            "loyalty_points": customer['loyalty_points'],
+            "tier": customer['tier'],
+            "categories": ",".join(category_list),
+            "brands": ",".join(brand_list),
+            "communication": communication,
+            "orders": ",".join(recent_order_list),
+        })
+    
+    categories = ', '.join(category_list)
+    brands = ', '.join(brand_list)
+    recent_orders = ', '.join(recent_order_list)
+    
+    lines = [
+        "RESULT: Customer Information Found",
+        f"Name: {customer['name']}",
+        f"Email: {customer['email']}",
+        f"Phone: {customer['phone']}",
+        f"Address: {customer['address']}",
+        f"Loyalty Points: {customer['loyalty_points']}",
+        f"Tier: {customer['tier']}",
+    ]
+    
+    # Sections without data are left out rather than sent as empty lines
+    preference_lines = [
+        f"  {label}: {value}"
+        for label, value in (("Categories", categories), ("Brands", brands), ("Communication", communication))
+        if value
+    ]
+    if preference_lines:
+        lines += ["", "Preferences:", *preference_lines]
+    if recent_orders:
+        lines += ["", f"Recent Orders: {recent_orders}"]
+    
+    return "\n".join(lines)
 
 class CustomerInfoTool(BaseTool):
     name: str = "customer_info"
@@ -156,36 +327,7 @@ class CustomerInfoTool(BaseTool):
     args_schema: Type[BaseModel] = CustomerInfoInput
     
     def _run(self, customer_id: str = None, email: str = None) -> str:
-        if customer_id:
-            customer = customer_db.get_customer_info(customer_id)
-        elif email:
-            customer = customer_db.get_customer_by_email(email)
-        else:
-            return "RESULT: Error - Please provide either customer ID or email address."
-        
-        if not customer:
-            if customer_id:
-                return f"RESULT: Customer ID {customer_id} not found in our system. This customer ID does not exist. Try asking the customer for their email address instead or use the get_customer_orders tool to search for their orders directly."
-            else:
-                return f"RESULT: No customer found with email {email}. This email is not registered in our system."
-        
-        info = f"""
-RESULT: Customer Information Found
-Name: {customer['name']}
-Email: {customer['email']}
-Phone: {customer['phone']}
-Address: {customer['address']}
-Loyalty Points: {customer['loyalty_points']}
-Tier: {customer['tier']}
-
-Preferences:
-  Categories: {', '.join(customer['preferences']['categories'])}
-  Brands: {', '.join(customer['preferences']['brands'])}
-  Communication: {customer['preferences']['communication']}
-
-Recent Orders: {', '.join(customer['order_history'])}
-"""
-        return info.strip()
+        return _cached_customer_info(customer_id, email)
 
 class CustomerOrdersTool(BaseTool):
     name: str = "get_customer_orders"
@@ -193,26 +335,23 @@ class CustomerOrdersTool(BaseTool):
     args_schema: Type[BaseModel] = CustomerOrdersInput
     
     def _run(self, customer_id: str) -> str:
-        # Try to get customer first to verify they exist
-        customer = customer_db.get_customer_info(customer_id)
+        # Customer and their order history in one lookup
+        customer, orders = customer_db.get_customer_with_orders(customer_id)
         if not customer:
             return f"RESULT: Customer ID {customer_id} not found. Cannot retrieve orders for non-existent customer. Ask customer for email address to search alternatively."
         
-        # Get customer's order history
-        orders = customer.get('order_history', [])
         if not orders:
             return f"RESULT: No orders found for customer {customer_id} ({customer['name']}). This customer has not placed any orders yet."
         
-        result = f"RESULT: Orders found for {customer['name']} (ID: {customer_id}):\n\n"
-        for order_id in orders:
-            order = order_db.get_order_status(order_id)
+        lines = [f"RESULT: Orders found for {customer['name']} (ID: {customer_id}):\n"]
+        for order_id, order in orders:
             if order:
-                result += f"Order {order_id}: {order['status'].title()} - ${order['total']:.2f} (Date: {order['order_date']})\n"
+                lines.append(_ORDER_ROW(order_id, _status_label(order['status']), order['total'], order['order_date']))
             else:
-                result += f"Order {order_id}: Status unknown\n"
+                lines.append(f"Order {order_id}: Status unknown")
         
-        result += f"\nTotal orders: {len(orders)}"
-        return result
+        lines.append(f"\nTotal orders: {len(orders)}")
+        return "\n".join(lines)
 
 class SearchOrdersByEmailTool(BaseTool):
     name: str = "search_orders_by_email"
@@ -220,24 +359,21 @@ class SearchOrdersByEmailTool(BaseTool):
     args_schema: Type[BaseModel] = SearchOrdersByEmailInput
     
     def _run(self, email: str) -> str:
-        # First try to find customer by email
-        customer = customer_db.get_customer_by_email(email)
+        # Customer and their order history in one lookup
+        customer, orders = customer_db.get_customer_with_orders_by_email(email)
         if not customer:
             return f"RESULT: No customer found with email {email}. This email is not registered in our system."
         
-        # Get their orders
-        orders = customer.get('order_history', [])
         if not orders:
             return f"RESULT: Customer with email {email} exists but has no orders yet."
         
-        result = f"RESULT: Orders found for {email}:\n\n"
-        for order_id in orders:
-            order = order_db.get_order_status(order_id)
+        lines = [f"RESULT: Orders found for {email}:\n"]
+        for order_id, order in orders:
             if order:
-                result += f"Order {order_id}: {order['status'].title()} - ${order['total']:.2f} (Date: {order['order_date']})\n"
+                lines.append(_ORDER_ROW(order_id, _status_label(order['status']), order['total'], order['order_date']))
         
-        result += f"\nTotal orders: {len(orders)}"
-        return result
+        lines.append(f"\nTotal orders: {len(orders)}")
+        return "\n".join(lines)
 
 class UpdatePreferencesTool(BaseTool):
     name: str = "update_preferences"
@@ -246,38 +382,146 @@ class UpdatePreferencesTool(BaseTool):
     
     def _run(self, customer_id: str, preferences: Dict[str, Any]) -> str:
         result = customer_db.update_preferences(customer_id, preferences)
+        _invalidate_read_caches()
         return f"RESULT: {result['message']}"
 
+# Weather by normalized city name: fresh entries expire after 10 minutes,
+# the last good reading is kept to answer when the API is failing
+_weather_cache = TTLCache(maxsize=512, ttl=600)
+_weather_stale = LRUCache(maxsize=512)
+_weather_lock = threading.Lock()
+
+@lru_cache(maxsize=1)
+def _weather_api_key() -> Optional[str]:
+    # Read on first use rather than at import, so a .env loaded by the app
+    # after this module is imported is still picked up
+    return os.getenv("WEATHER_API_KEY")
+
+@lru_cache(maxsize=1)
+def _weather_session():
+    """Keep-alive connection pool for the weather API, with a couple of quick
+    retries on gateway errors; requests is only imported once it's needed"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = "gzip"
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+@lru_cache(maxsize=1)
+def _async_weather_client():
+    """Async counterpart of _weather_session for the agent's async tool path,
+    on the same pool sizes; httpx is only imported once it's needed"""
+    import httpx
+    
+    return httpx.AsyncClient(
+        timeout=5,
+        headers={"Accept-Encoding": "gzip"},
+        limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+        transport=httpx.AsyncHTTPTransport(retries=2),
+    )
+
+_warned_no_key = False
+
+def _mock_weather(city: str) -> tuple:
+    global _warned_no_key
+    if not _warned_no_key:
+        logger.warning("Weather API key not configured; using mock data")
+        _warned_no_key = True
+    city_hash = _stable_hash(city)
+    condition = _WEATHER_CONDITIONS[city_hash % len(_WEATHER_CONDITIONS)]
+    temp = 15 + (city_hash % 30)
+    return condition, temp, condition in _GOOD_SHIPPING
+
+def _weather_url(city: str, api_key: str) -> str:
+    return f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
+
+def _parse_weather(status_code: int, content: bytes) -> Optional[tuple]:
+    data = orjson.loads(content)
+    
+    if status_code != 200:
+        return None
+    weather = data['weather'][0]
+    return weather['description'], data['main']['temp'], weather['main'].lower() in _GOOD_SHIPPING
+
+def _fetch_weather(city: str) -> Optional[tuple]:
+    """Get (condition, temperature, good_for_shipping) for a city, or None if the API has no answer"""
+    api_key = _weather_api_key()
+    if not api_key:
+        return _mock_weather(city)
+    
+    response = _weather_session().get(_weather_url(city, api_key), timeout=5)
+    return _parse_weather(response.status_code, response.content)
+
+async def _afetch_weather(city: str) -> Optional[tuple]:
+    """Async version of _fetch_weather"""
+    api_key = _weather_api_key()
+    if not api_key:
+        return _mock_weather(city)
+    
+    response = await _async_weather_client().get(_weather_url(city, api_key))
+    return _parse_weather(response.status_code, response.content)
+
+# The cache lock is only held for dict operations, never across I/O, so the
+# sync and async paths can share it
+def _cached_weather(key: str) -> Optional[tuple]:
+    with _weather_lock:
+        return _weather_cache.get(key)
+
+def _remember_weather(key: str, weather: Optional[tuple]):
+    if weather is not None:
+        with _weather_lock:
+            _weather_cache[key] = _weather_stale[key] = weather
+
+def _weather_reply(city: str, weather: Optional[tuple]) -> str:
+    if weather is None:
+        return f"RESULT: Could not get weather information for {city}."
+    condition, temp, good_for_shipping = weather
+    return f"RESULT: Weather in {city}: {condition.title()}, {temp}°C. " \
+           f"{'Good conditions for shipping.' if good_for_shipping else 'Potential shipping delays due to weather.'}"
+
+def _weather_error_reply(city: str, key: str, error: Exception) -> str:
+    # Serve the last good reading rather than failing outright
+    with _weather_lock:
+        weather = _weather_stale.get(key)
+    if weather is None:
+        return f"RESULT: Error getting weather information: {str(error)}"
+    return _weather_reply(city, weather)
+
 class WeatherTool(BaseTool):
     name: str = "get_weather"
     description: str = "Get current weather information for a city. Use this for shipping estimates or weather-based product recommendations."
     args_schema: Type[BaseModel] = WeatherInput
     
     def _run(self, city: str) -> str:
-        api_key = os.getenv("WEATHER_API_KEY")
-        
-        if not api_key:
-            print("⚠️ Weather API key not configured. Using mock data.")
-            weather_conditions = ["sunny", "rainy", "cloudy", "snowy", "windy"]
-            condition = weather_conditions[hash(city) % len(weather_conditions)]
-            temp = 15 + (hash(city) % 30)
-            return f"RESULT: Weather in {city}: {condition.title()}, {temp}°C. " \
-                   f"{'Good conditions for shipping.' if condition in ['sunny', 'cloudy'] else 'Potential shipping delays due to weather.'}"
-        
-        try:
-            url = f"http://api.openweathermap.org/data/2.5/weather?q={city}&appid={api_key}&units=metric"
-            response = requests.get(url, timeout=5)
-            data = response.json()
-            
-            if response.status_code == 200:
-                weather = data['weather'][0]['description']
-                temp = data['main']['temp']
-                return f"RESULT: Weather in {city}: {weather.title()}, {temp}°C. " \
-                       f"{'Good conditions for shipping.' if 'clear' in weather or 'cloud' in weather else 'Potential shipping delays due to weather.'}"
-            else:
-                return f"RESULT: Could not get weather information for {city}."
-        except Exception as e:
-            return f"RESULT: Error getting weather information: {str(e)}"
+        key = city.strip().lower()
+        weather = _cached_weather(key)
+        if weather is None:
+            try:
+                weather = _fetch_weather(city)
+            except Exception as e:
+                return _weather_error_reply(city, key, e)
+            _remember_weather(key, weather)
+        return _weather_reply(city, weather)
+    
+    async def _arun(self, city: str) -> str:
+        key = city.strip().lower()
+        weather = _cached_weather(key)
+        if weather is None:
+            try:
+                weather = await _afetch_weather(city)
+            except Exception as e:
+                return _weather_error_reply(city, key, e)
+            _remember_weather(key, weather)
+        return _weather_reply(city, weather)
 
 class ProductRecommendationTool(BaseTool):
     name: str = "product_recommendations"
@@ -290,24 +534,27 @@ class ProductRecommendationTool(BaseTool):
         if not recommendations:
             return "RESULT: No recommendations available at the moment."
         
-        result = "RESULT: Here are some recommended products:\n\n"
+        parts = ["RESULT: Here are some recommended products:"]
         for product in recommendations[:5]:
-            result += f"**{product['name']}** - ${product['price']:.2f}\n"
-            result += f"{product['description']}\n"
-            result += f"Rating: {product['rating']}/5.0\n\n"
+            parts.append(
+                f"**{product.name}** - ${product.price:.2f}\n"
+                f"{product.description}\n"
+                f"Rating: {product.rating}/5.0"
+            )
         
-        return result.strip()
+        return "\n\n".join(parts)
 class AskQueryTool(BaseTool):
     name: str = "ask_query"
     description: str = "Fallback tool to ask the customer for more details or clarify their request."
-    args_schema: Type[BaseModel] = BaseModel  # no args needed
+    args_schema: Type[BaseModel] = AskQueryInput
 
     def _run(self, **kwargs) -> str:
         return "RESULT: Could you please provide more details or clarify your request so I can assist you better?"
 
-# List of all tools
-def get_tools():
-    return [
+# List of all tools, instantiated once and shared
+@lru_cache(maxsize=1)
+def _tool_instances():
+    return (
         OrderStatusTool(),
         OrderCancelTool(),
         ReturnProcessTool(),
@@ -320,4 +567,7 @@ def get_tools():
         WeatherTool(),
         ProductRecommendationTool(),
         AskQueryTool()
-    ]
\ No newline at end of file
+    )
+
+def get_tools():
+    return list(_tool_instances())
\ No newline at end of file